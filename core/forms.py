@@ -25,15 +25,13 @@ class IncidentForm(forms.ModelForm):
             "report_date": forms.HiddenInput(),
             "report_time": forms.HiddenInput(),
         }
-
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-
-        self.fields["type"].label = "Tipo de incidente"
-        self.fields["severity"].label = "Gravedad"
-        self.fields["incident_date"].label = "Fecha del incidente"
-        self.fields["incident_time"].label = "Hora del incidente"
-        self.fields["description"].label = "Descripción"
+        labels = {
+            "type": "Tipo de incidente",
+            "severity": "Gravedad",
+            "incident_date": "Fecha del incidente",
+            "incident_time": "Hora del incidente",
+            "description": "Descripción",
+        }
 
     def save(self, commit=True):
         latitude = self.cleaned_data.get("latitude")
@@ -1,16 +1,287 @@
+import hashlib
 import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from itertools import product
+from typing import TYPE_CHECKING
 
-import skfuzzy as fuzz
-import skfuzzy.control as ctrl
+import numpy as np
 from numpy import ndarray, arange
 
+from utils.config import FUZZY_CACHE_DIR
+
+# scikit-fuzzy solo se usa en la simulación de referencia; se importa al
+# construirla para no cargarlo (ni sus dependencias) en cada proceso
+if TYPE_CHECKING:
+    import skfuzzy.control as ctrl
+
 logger = logging.getLogger(__name__)
 
+# Universos de valores
+UNIVERSES = {
+    "incidents": arange(0, 51, 1),  # Número de incidentes cercanos
+    "gravity": arange(1, 5.1, 0.1),  # Gravedad de los incidentes (1-5)
+    "risk_zone": arange(0, 101, 1),  # Distancia a zona de riesgo (0-100 m)
+    "time": arange(0, 61, 1),  # Días desde el incidente (0-60 días)
+    "danger": arange(0, 1.01, 0.01),  # Índice de peligrosidad (0-1)
+}
+
+# Funciones de pertenencia (gbellmf: a, b, c) por variable
+MEMBERSHIPS = {
+    "incidents": {
+        "low": (5, 2, 0),
+        "moderate": (14, 3, 25),
+        "high": (10, 4, 50),
+    },
+    "gravity": {
+        "low": (0.5, 3, 1),
+        "moderate": (0.7, 3.5, 2.5),
+        "high": (0.9, 4, 5),
+    },
+    "risk_zone": {
+        "near": (15, 2, 0),
+        "moderate": (20, 3, 50),
+        "far": (25, 4, 100),
+    },
+    "time": {
+        "recent": (10, 2, 0),
+        "medium": (15, 3, 30),
+        "old": (20, 4, 60),
+    },
+    "danger": {
+        "safe": (0.1, 2, 0),
+        "low": (0.15, 3, 0.3),
+        "moderate": (0.2, 3.5, 0.55),
+        "high": (0.25, 4, 0.75),
+        "very_high": (0.3, 4.5, 1),
+    },
+}
+
+# Reglas difusas
+CATEGORIES = {
+    "incidents": ("low", "moderate", "high"),
+    "gravity": ("low", "moderate", "high"),
+    "risk_zone": ("near", "moderate", "far"),
+    "time": ("recent", "medium", "old"),
+}
+CONSEQUENT_MAP = {
+    ("low", "low", "far", "old"): "safe",
+    ("low", "low", "far", "medium"): "safe",
+    ("low", "low", "far", "recent"): "low",
+    ("low", "low", "moderate", "old"): "low",
+    ("low", "low", "moderate", "medium"): "low",
+    ("low", "low", "moderate", "recent"): "moderate",
+    ("low", "low", "near", "old"): "low",
+    ("low", "low", "near", "medium"): "moderate",
+    ("low", "low", "near", "recent"): "moderate",
+    ("low", "moderate", "far", "old"): "low",
+    ("low", "moderate", "far", "medium"): "low",
+    ("low", "moderate", "far", "recent"): "moderate",
+    ("low", "moderate", "moderate", "old"): "moderate",
+    ("low", "moderate", "moderate", "medium"): "moderate",
+    ("low", "moderate", "moderate", "recent"): "high",
+    ("low", "moderate", "near", "old"): "moderate",
+    ("low", "moderate", "near", "medium"): "high",
+    ("low", "moderate", "near", "recent"): "high",
+    ("low", "high", "far", "old"): "moderate",
+    ("low", "high", "far", "medium"): "moderate",
+    ("low", "high", "far", "recent"): "high",
+    ("low", "high", "moderate", "old"): "high",
+    ("low", "high", "moderate", "medium"): "high",
+    ("low", "high", "moderate", "recent"): "very_high",
+    ("low", "high", "near", "old"): "high",
+    ("low", "high", "near", "medium"): "very_high",
+    ("low", "high", "near", "recent"): "very_high",
+    ("moderate", "low", "far", "old"): "low",
+    ("moderate", "low", "far", "medium"): "low",
+    ("moderate", "low", "far", "recent"): "moderate",
+    ("moderate", "low", "moderate", "old"): "moderate",
+    ("moderate", "low", "moderate", "medium"): "moderate",
+    ("moderate", "low", "moderate", "recent"): "high",
+    ("moderate", "low", "near", "old"): "moderate",
+    ("moderate", "low", "near", "medium"): "high",
+    ("moderate", "low", "near", "recent"): "high",
+    ("moderate", "moderate", "far", "old"): "moderate",
+    ("moderate", "moderate", "far", "medium"): "moderate",
+    ("moderate", "moderate", "far", "recent"): "high",
+    ("moderate", "moderate", "moderate", "old"): "high",
+    ("moderate", "moderate", "moderate", "medium"): "high",
+    ("moderate", "moderate", "moderate", "recent"): "very_high",
+    ("moderate", "moderate", "near", "old"): "high",
+    ("moderate", "moderate", "near", "medium"): "very_high",
+    ("moderate", "moderate", "near", "recent"): "very_high",
+    ("moderate", "high", "far", "old"): "high",
+    ("moderate", "high", "far", "medium"): "high",
+    ("moderate", "high", "far", "recent"): "very_high",
+    ("moderate", "high", "moderate", "old"): "very_high",
+    ("moderate", "high", "moderate", "medium"): "very_high",
+    ("moderate", "high", "moderate", "recent"): "very_high",
+    ("moderate", "high", "near", "old"): "very_high",
+    ("moderate", "high", "near", "medium"): "very_high",
+    ("moderate", "high", "near", "recent"): "very_high",
+    ("high", "low", "far", "old"): "moderate",
+    ("high", "low", "far", "medium"): "moderate",
+    ("high", "low", "far", "recent"): "high",
+    ("high", "low", "moderate", "old"): "high",
+    ("high", "low", "moderate", "medium"): "high",
+    ("high", "low", "moderate", "recent"): "very_high",
+    ("high", "low", "near", "old"): "high",
+    ("high", "low", "near", "medium"): "very_high",
+    ("high", "low", "near", "recent"): "very_high",
+    ("high", "moderate", "far", "old"): "high",
+    ("high", "moderate", "far", "medium"): "high",
+    ("high", "moderate", "far", "recent"): "very_high",
+    ("high", "moderate", "moderate", "old"): "very_high",
+    ("high", "moderate", "moderate", "medium"): "very_high",
+    ("high", "moderate", "moderate", "recent"): "very_high",
+    ("high", "moderate", "near", "old"): "very_high",
+    ("high", "moderate", "near", "medium"): "very_high",
+    ("high", "moderate", "near", "recent"): "very_high",
+    ("high", "high", "far", "old"): "very_high",
+    ("high", "high", "far", "medium"): "very_high",
+    ("high", "high", "far", "recent"): "very_high",
+    ("high", "high", "moderate", "old"): "very_high",
+    ("high", "high", "moderate", "medium"): "very_high",
+    ("high", "high", "moderate", "recent"): "very_high",
+    ("high", "high", "near", "old"): "very_high",
+    ("high", "high", "near", "medium"): "very_high",
+    ("high", "high", "near", "recent"): "very_high",
+}
+
+# Reglas como índices de etiqueta por antecedente y consecuente
+DANGER_LABELS = tuple(MEMBERSHIPS["danger"])
+RULE_TABLE = np.full(
+    tuple(len(labels) for labels in CATEGORIES.values()),
+    DANGER_LABELS.index("low"),
+    dtype=np.int8,
+)
+for _labels, _consequent in CONSEQUENT_MAP.items():
+    RULE_TABLE[
+        tuple(
+            CATEGORIES[name].index(label)
+            for name, label in zip(CATEGORIES, _labels)
+        )
+    ] = DANGER_LABELS.index(_consequent)
+
+RULE_ANTECEDENTS = np.argwhere(np.ones_like(RULE_TABLE, dtype=bool))
+RULE_CONSEQUENTS = RULE_TABLE.ravel()
+
+# Rejilla de la tabla de peligrosidad precalculada (inicio, fin, paso)
+LUT_GRID = {
+    "incidents": (0, 50, 1),
+    "gravity": (1, 5, 0.1),
+    "risk_zone": (0, 100, 5),
+    "time": (0, 60, 2),
+}
+
+# Versión del algoritmo con el que se calcula la tabla; incrementarla cada
+# vez que cambie la inferencia (infer_fuzzy_danger y sus auxiliares)
+LUT_VERSION = 2
+
+# Huella de la definición del sistema: cualquier cambio en reglas, funciones
+# de pertenencia, universos, rejilla o algoritmo produce otro archivo de caché
+FIS_KEY = hashlib.sha1(
+    repr(
+        (
+            LUT_VERSION,
+            CONSEQUENT_MAP,
+            MEMBERSHIPS,
+            {name: (u[0], u[-1], u.size) for name, u in UNIVERSES.items()},
+            LUT_GRID,
+        )
+    ).encode()
+).hexdigest()[:12]
+LUT_PATH = FUZZY_CACHE_DIR / f"danger_lut_{FIS_KEY}.npy"
+
+
+def gbell(x: ndarray, params) -> ndarray:
+    """
+    Evalúa varias funciones de pertenencia de campana generalizada a la vez.
+
+    Equivale a llamar fuzz.gbellmf por cada función, pero en una sola
+    operación vectorizada.
+
+    Args:
+        x: Valores a evaluar.
+        params: Parámetros (a, b, c) de cada función.
+
+    Returns:
+        Arreglo con una columna por función de pertenencia.
+    """
+    a, b, c = np.asarray(list(params), dtype=float).T
+    x = np.asarray(x, dtype=float)[..., None]
+
+    # Operaciones en el mismo arreglo para no crear temporales
+    out = np.subtract(x, c)
+    out /= a
+    np.abs(out, out=out)
+    out **= 2 * b
+    out += 1.0
+    return np.reciprocal(out, out=out)
+
+
+# Funciones de pertenencia muestreadas sobre su universo (una columna por
+# etiqueta)
+MEMBERSHIP_CURVES = {
+    name: gbell(universe, MEMBERSHIPS[name].values())
+    for name, universe in UNIVERSES.items()
+}
+
+
+def centroid_weights(x: ndarray) -> tuple[ndarray, ndarray]:
+    """
+    Calcula los pesos que integran una curva lineal por tramos sobre x.
+
+    El área y el momento de la curva son lineales en sus valores, por lo que
+    el centroide se reduce a dos productos punto.
+
+    Args:
+        x: Universo sobre el que se muestrea la curva.
+
+    Returns:
+        Pesos del área y del momento para cada punto del universo.
+    """
+    dx = np.diff(x)
+    area = np.zeros_like(x)
+    area[:-1] += dx / 2
+    area[1:] += dx / 2
+    moment = np.zeros_like(x)
+    moment[:-1] += dx * (2 * x[:-1] + x[1:]) / 6
+    moment[1:] += dx * (x[:-1] + 2 * x[1:]) / 6
+    return area, moment
+
+
+CENTROID_WEIGHTS = np.column_stack(centroid_weights(UNIVERSES["danger"]))
+
+
+def interp_memberships(name: str, values: ndarray) -> ndarray:
+    """
+    Calcula la pertenencia de valores a cada etiqueta de una variable.
+
+    Interpola las curvas precalculadas, igual que scikit-fuzzy al
+    fuzzificar una entrada.
+
+    Args:
+        name: Nombre de la variable.
+        values: Valores a fuzzificar.
+
+    Returns:
+        Arreglo con una columna por etiqueta de la variable.
+    """
+    universe = UNIVERSES[name]
+    curves = MEMBERSHIP_CURVES[name]
+
+    out = np.empty((len(values), curves.shape[1]))
+    for label, curve in enumerate(curves.T):
+        out[:, label] = np.interp(values, universe, curve)
+    return out
+
 
 def create_fuzzy_variable(
     name: str, universe: ndarray, membership: dict, is_consequent: bool = False
-) -> ctrl.Antecedent | ctrl.Consequent:
+) -> "ctrl.Antecedent | ctrl.Consequent":
     """
     Crea una variable difusa con funciones de pertenencia.
 
@@ -23,6 +294,8 @@ def create_fuzzy_variable(
     Returns:
         Variable difusa configurada.
     """
+    import skfuzzy.control as ctrl
+
     variable = (
         ctrl.Consequent(universe, name)
         if is_consequent
@@ -30,176 +303,239 @@ def create_fuzzy_variable(
     )
 
     # Aplicación de funciones de membresía
-    for label, values in membership.items():
-        variable[label] = fuzz.gbellmf(variable.universe, *values)
+    curves = gbell(variable.universe, membership.values())
+    for i, label in enumerate(membership):
+        variable[label] = curves[:, i]
 
     return variable
 
 
-def build_fuzzy_system() -> ctrl.ControlSystem:
+def build_fuzzy_system() -> "ctrl.ControlSystem":
     """
     Crea el sistema difuso para evaluar la peligrosidad de una ruta.
 
     Returns:
         Sistema difuso.
     """
-    # Universos de valores
-    incidents_universe = arange(0, 51, 1)  # Número de incidentes cercanos
-    gravity_universe = arange(1, 5.1, 0.1)  # Gravedad de los incidentes (1-5)
-    risk_zone_universe = arange(
-        0, 101, 1
-    )  # Distancia a zona de riesgo (0-100 metros)
-    time_universe = arange(0, 61, 1)  # Días desde el incidente (0-60 días)
-    danger_universe = arange(0, 1.01, 0.01)  # Índice de peligrosidad (0-1)
+    import skfuzzy.control as ctrl
 
     # Variables difusas
-    incidents = create_fuzzy_variable(
-        "incidents",
-        incidents_universe,
-        {"low": (5, 2, 0), "moderate": (14, 3, 25), "high": (10, 4, 50)},
-    )
-    gravity = create_fuzzy_variable(
-        "gravity",
-        gravity_universe,
-        {"low": (0.5, 3, 1), "moderate": (0.7, 3.5, 2.5), "high": (0.9, 4, 5)},
-    )
-    risk_zone = create_fuzzy_variable(
-        "risk_zone",
-        risk_zone_universe,
-        {"near": (15, 2, 0), "moderate": (20, 3, 50), "far": (25, 4, 100)},
-    )
-    time = create_fuzzy_variable(
-        "time",
-        time_universe,
-        {"recent": (10, 2, 0), "medium": (15, 3, 30), "old": (20, 4, 60)},
-    )
-    danger = create_fuzzy_variable(
-        "danger",
-        danger_universe,
-        {
-            "safe": (0.1, 2, 0),
-            "low": (0.15, 3, 0.3),
-            "moderate": (0.2, 3.5, 0.55),
-            "high": (0.25, 4, 0.75),
-            "very_high": (0.3, 4.5, 1),
-        },
-        is_consequent=True,
-    )
-
-    # Reglas difusas
-    categories = {
-        "incidents": ("low", "moderate", "high"),
-        "gravity": ("low", "moderate", "high"),
-        "risk_zone": ("near", "moderate", "far"),
-        "time": ("recent", "medium", "old"),
-    }
-    consequent_map = {
-        ("low", "low", "far", "old"): "safe",
-        ("low", "low", "far", "medium"): "safe",
-        ("low", "low", "far", "recent"): "low",
-        ("low", "low", "moderate", "old"): "low",
-        ("low", "low", "moderate", "medium"): "low",
-        ("low", "low", "moderate", "recent"): "moderate",
-        ("low", "low", "near", "old"): "low",
-        ("low", "low", "near", "medium"): "moderate",
-        ("low", "low", "near", "recent"): "moderate",
-        ("low", "moderate", "far", "old"): "low",
-        ("low", "moderate", "far", "medium"): "low",
-        ("low", "moderate", "far", "recent"): "moderate",
-        ("low", "moderate", "moderate", "old"): "moderate",
-        ("low", "moderate", "moderate", "medium"): "moderate",
-        ("low", "moderate", "moderate", "recent"): "high",
-        ("low", "moderate", "near", "old"): "moderate",
-        ("low", "moderate", "near", "medium"): "high",
-        ("low", "moderate", "near", "recent"): "high",
-        ("low", "high", "far", "old"): "moderate",
-        ("low", "high", "far", "medium"): "moderate",
-        ("low", "high", "far", "recent"): "high",
-        ("low", "high", "moderate", "old"): "high",
-        ("low", "high", "moderate", "medium"): "high",
-        ("low", "high", "moderate", "recent"): "very_high",
-        ("low", "high", "near", "old"): "high",
-        ("low", "high", "near", "medium"): "very_high",
-        ("low", "high", "near", "recent"): "very_high",
-        ("moderate", "low", "far", "old"): "low",
-        ("moderate", "low", "far", "medium"): "low",
-        ("moderate", "low", "far", "recent"): "moderate",
-        ("moderate", "low", "moderate", "old"): "moderate",
-        ("moderate", "low", "moderate", "medium"): "moderate",
-        ("moderate", "low", "moderate", "recent"): "high",
-        ("moderate", "low", "near", "old"): "moderate",
-        ("moderate", "low", "near", "medium"): "high",
-        ("moderate", "low", "near", "recent"): "high",
-        ("moderate", "moderate", "far", "old"): "moderate",
-        ("moderate", "moderate", "far", "medium"): "moderate",
-        ("moderate", "moderate", "far", "recent"): "high",
-        ("moderate", "moderate", "moderate", "old"): "high",
-        ("moderate", "moderate", "moderate", "medium"): "high",
-        ("moderate", "moderate", "moderate", "recent"): "very_high",
-        ("moderate", "moderate", "near", "old"): "high",
-        ("moderate", "moderate", "near", "medium"): "very_high",
-        ("moderate", "moderate", "near", "recent"): "very_high",
-        ("moderate", "high", "far", "old"): "high",
-        ("moderate", "high", "far", "medium"): "high",
-        ("moderate", "high", "far", "recent"): "very_high",
-        ("moderate", "high", "moderate", "old"): "very_high",
-        ("moderate", "high", "moderate", "medium"): "very_high",
-        ("moderate", "high", "moderate", "recent"): "very_high",
-        ("moderate", "high", "near", "old"): "very_high",
-        ("moderate", "high", "near", "medium"): "very_high",
-        ("moderate", "high", "near", "recent"): "very_high",
-        ("high", "low", "far", "old"): "moderate",
-        ("high", "low", "far", "medium"): "moderate",
-        ("high", "low", "far", "recent"): "high",
-        ("high", "low", "moderate", "old"): "high",
-        ("high", "low", "moderate", "medium"): "high",
-        ("high", "low", "moderate", "recent"): "very_high",
-        ("high", "low", "near", "old"): "high",
-        ("high", "low", "near", "medium"): "very_high",
-        ("high", "low", "near", "recent"): "very_high",
-        ("high", "moderate", "far", "old"): "high",
-        ("high", "moderate", "far", "medium"): "high",
-        ("high", "moderate", "far", "recent"): "very_high",
-        ("high", "moderate", "moderate", "old"): "very_high",
-        ("high", "moderate", "moderate", "medium"): "very_high",
-        ("high", "moderate", "moderate", "recent"): "very_high",
-        ("high", "moderate", "near", "old"): "very_high",
-        ("high", "moderate", "near", "medium"): "very_high",
-        ("high", "moderate", "near", "recent"): "very_high",
-        ("high", "high", "far", "old"): "very_high",
-        ("high", "high", "far", "medium"): "very_high",
-        ("high", "high", "far", "recent"): "very_high",
-        ("high", "high", "moderate", "old"): "very_high",
-        ("high", "high", "moderate", "medium"): "very_high",
-        ("high", "high", "moderate", "recent"): "very_high",
-        ("high", "high", "near", "old"): "very_high",
-        ("high", "high", "near", "medium"): "very_high",
-        ("high", "high", "near", "recent"): "very_high",
+    variables = {
+        name: create_fuzzy_variable(
+            name,
+            UNIVERSES[name],
+            MEMBERSHIPS[name],
+            is_consequent=name == "danger",
+        )
+        for name in UNIVERSES
     }
+    incidents, gravity, risk_zone, time, danger = variables.values()
 
     rules = (
         ctrl.Rule(
             incidents[inc] & gravity[grav] & risk_zone[zone] & time[tim],
-            danger[consequent_map.get((inc, grav, zone, tim), "low")],
+            danger[DANGER_LABELS[RULE_TABLE[index]]],
+        )
+        for index, (inc, grav, zone, tim) in zip(
+            np.ndindex(RULE_TABLE.shape), product(*CATEGORIES.values())
         )
-        for inc, grav, zone, tim in product(*categories.values())
     )
 
     # Sistema difuso
     return ctrl.ControlSystem(rules)
 
 
-fuzzy_system = build_fuzzy_system()
+_local = threading.local()
 
 
-def calculate_fuzzy_danger(
+@lru_cache(maxsize=1)
+def get_fuzzy_system() -> "ctrl.ControlSystem":
+    """
+    Construye el sistema difuso la primera vez que se necesita.
+
+    Returns:
+        Sistema difuso compartido por todo el proceso.
+    """
+    return build_fuzzy_system()
+
+
+def get_simulator() -> "ctrl.ControlSystemSimulation":
+    """
+    Obtiene el simulador del hilo actual, creándolo si no existe.
+
+    Returns:
+        Simulación reutilizable del sistema difuso.
+    """
+    simulator = getattr(_local, "simulator", None)
+    if simulator is None:
+        import skfuzzy.control as ctrl
+
+        simulator = _local.simulator = ctrl.ControlSystemSimulation(
+            get_fuzzy_system(),
+            clip_to_bounds=False,
+            cache=True,
+            flush_after_run=1000,
+        )
+    return simulator
+
+
+def infer_fuzzy_danger(*inputs: ndarray, chunk_size: int = 4096) -> ndarray:
+    """
+    Evalúa el sistema difuso (Mamdani, centroide) sobre arreglos de entradas.
+
+    Reproduce la inferencia de scikit-fuzzy con operaciones vectorizadas:
+    mínimo como conjunción, máximo como agregación y centroide sobre el
+    universo de peligrosidad.
+
+    Args:
+        inputs: Valores de cada antecedente, en el orden de CATEGORIES.
+        chunk_size: Número de elementos evaluados por bloque (cada bloque
+            se reparte a un hilo).
+
+    Returns:
+        Arreglo con la peligrosidad de cada elemento.
+    """
+    inputs = np.broadcast_arrays(*(np.asarray(i, dtype=float) for i in inputs))
+    shape = inputs[0].shape
+    flat = [
+        np.clip(values.ravel(), UNIVERSES[name][0], UNIVERSES[name][-1])
+        for name, values in zip(CATEGORIES, inputs)
+    ]
+
+    x = UNIVERSES["danger"]
+    terms = MEMBERSHIP_CURVES["danger"].T
+    output = np.empty(flat[0].size)
+
+    def evaluate(start: int) -> None:
+        block = slice(start, start + chunk_size)
+
+        # Activación de cada regla (mínimo de sus antecedentes)
+        firing = interp_memberships("incidents", flat[0][block])[
+            :, RULE_ANTECEDENTS[:, 0]
+        ]
+        for dim, name in enumerate(list(CATEGORIES)[1:], start=1):
+            mu = interp_memberships(name, flat[dim][block])
+            np.minimum(firing, mu[:, RULE_ANTECEDENTS[:, dim]], out=firing)
+
+        # Agregación por etiqueta del consecuente y recorte de su curva
+        mf = np.zeros((firing.shape[0], x.size))
+        for label, term in enumerate(terms):
+            cut = firing[:, RULE_CONSEQUENTS == label].max(axis=1)
+            np.maximum(mf, np.minimum(cut[:, None], term), out=mf)
+
+        # Centroide exacto de la curva lineal por tramos
+        area, moment = (mf @ CENTROID_WEIGHTS).T
+        output[block] = moment / np.fmax(area, np.finfo(float).eps)
+
+    starts = range(0, output.size, chunk_size)
+    if len(starts) > 1:
+        # NumPy libera el GIL, por lo que los bloques avanzan en paralelo
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            list(executor.map(evaluate, starts))
+    else:
+        for start in starts:
+            evaluate(start)
+
+    return output.reshape(shape)
+
+
+def load_danger_lut() -> ndarray:
+    """
+    Carga la tabla de peligrosidad desde caché o la calcula y la guarda.
+
+    Returns:
+        Tabla 4-D de peligrosidad indexada según LUT_GRID.
+    """
+    axes = [
+        arange(start, stop + step / 2, step)
+        for start, stop, step in LUT_GRID.values()
+    ]
+    shape = tuple(len(axis) for axis in axes)
+
+    # NAVI_REBUILD_FUZZY_LUT fuerza el recálculo durante el desarrollo
+    if not os.environ.get("NAVI_REBUILD_FUZZY_LUT"):
+        try:
+            lut = np.load(LUT_PATH)
+            if lut.shape == shape:
+                return lut
+            logger.warning("Tabla de peligrosidad corrupta, recalculando.")
+        except FileNotFoundError:
+            pass
+        except (ValueError, OSError, EOFError) as e:
+            logger.warning(
+                f"Tabla de peligrosidad ilegible ({e}), recalculando."
+            )
+
+    logger.info(f"Calculando tabla de peligrosidad {shape}...")
+    lut = infer_fuzzy_danger(*np.meshgrid(*axes, indexing="ij"))
+
+    # Escritura bajo un nombre temporal por proceso e hilo y reemplazo
+    # atómico, para que nadie lea ni pise una tabla a medio escribir
+    tmp = LUT_PATH.with_name(
+        f"{LUT_PATH.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+    )
+    with open(tmp, "wb") as file:
+        np.save(file, lut)
+    os.replace(tmp, LUT_PATH)
+    return lut
+
+
+@lru_cache(maxsize=1)
+def get_danger_lut() -> ndarray:
+    """
+    Carga la tabla de peligrosidad la primera vez que se necesita.
+
+    Returns:
+        Tabla compartida por todo el proceso.
+    """
+    return load_danger_lut()
+
+
+def lookup_danger(*inputs: ndarray) -> ndarray:
+    """
+    Interpola cuadrilinealmente la tabla de peligrosidad.
+
+    Args:
+        inputs: Valores de cada antecedente, en el orden de CATEGORIES.
+
+    Returns:
+        Arreglo con la peligrosidad de cada elemento.
+    """
+    inputs = np.broadcast_arrays(*(np.asarray(i, dtype=float) for i in inputs))
+    danger_lut = get_danger_lut()
+
+    # Celda de la rejilla y posición fraccionaria dentro de ella
+    lower, fractions = [], []
+    for values, (start, stop, step), size in zip(
+        inputs, LUT_GRID.values(), danger_lut.shape
+    ):
+        position = (np.clip(values, start, stop) - start) / step
+        index = np.minimum(position.astype(int), size - 2)
+        lower.append(index)
+        fractions.append(position - index)
+
+    # Suma ponderada de las 16 esquinas de la celda
+    danger = np.zeros(inputs[0].shape)
+    for corner in product((0, 1), repeat=len(inputs)):
+        weight = np.ones(inputs[0].shape)
+        for bit, fraction in zip(corner, fractions):
+            weight *= fraction if bit else 1 - fraction
+        cell = tuple(index + bit for index, bit in zip(lower, corner))
+        danger += weight * danger_lut[cell]
+
+    return danger
+
+
+def simulate_fuzzy_danger(
     num_incidents: int,
     avg_gravity: float,
     risk_zone_distance: float,
     time: float,
 ) -> float:
     """
-    Evalúa el nivel de peligro de una ruta usando lógica difusa.
+    Evalúa el nivel de peligro ejecutando la simulación de scikit-fuzzy.
+
+    Es la implementación de referencia de calculate_fuzzy_danger.
 
     Args:
         num_incidents: Número de incidentes cercanos.
@@ -213,17 +549,12 @@ def calculate_fuzzy_danger(
     if num_incidents <= 0 and avg_gravity <= 0:
         return 0.0
 
-    simulator = ctrl.ControlSystemSimulation(
-        fuzzy_system,
-        clip_to_bounds=True,
-        cache=True,
-        flush_after_run=1000,
-    )
+    simulator = get_simulator()
 
-    # Definición de entradas
+    # Definición de entradas, acotadas a sus universos
     simulator.inputs(
         {
-            "incidents": max(0, num_incidents),
+            "incidents": max(0, min(num_incidents, 50)),
             "gravity": max(1, min(avg_gravity, 5)),
             "risk_zone": max(0, min(risk_zone_distance, 100)),
             "time": max(0, min(time, 60)),
@@ -235,3 +566,61 @@ def calculate_fuzzy_danger(
     danger = round(simulator.output["danger"], 2)
 
     return danger
+
+
+def calculate_fuzzy_danger(
+    num_incidents: int,
+    avg_gravity: float,
+    risk_zone_distance: float,
+    time: float,
+) -> float:
+    """
+    Evalúa el nivel de peligro de una ruta usando lógica difusa.
+
+    Versión escalar de calculate_fuzzy_danger_batch, con el mismo redondeo.
+
+    Args:
+        num_incidents: Número de incidentes cercanos.
+        avg_gravity: Gravedad promedio de los incidentes.
+        risk_zone_distance: Distancia a la zona de riesgo en metros.
+        time: Días que han pasado desde el incidente.
+
+    Returns:
+        Índice difuso de peligrosidad entre 0 y 1.
+    """
+    return float(
+        calculate_fuzzy_danger_batch(
+            num_incidents, avg_gravity, risk_zone_distance, time
+        )
+    )
+
+
+def calculate_fuzzy_danger_batch(
+    num_incidents: ndarray,
+    avg_gravity: ndarray,
+    risk_zone_distance: ndarray,
+    time: ndarray,
+) -> ndarray:
+    """
+    Evalúa el nivel de peligro de muchos elementos en una sola pasada.
+
+    Interpola sobre la tabla precalculada en lugar de ejecutar la inferencia.
+
+    Args:
+        num_incidents: Número de incidentes cercanos de cada elemento.
+        avg_gravity: Gravedad promedio de los incidentes.
+        risk_zone_distance: Distancia a la zona de riesgo en metros.
+        time: Días que han pasado desde el incidente.
+
+    Returns:
+        Arreglo de índices difusos de peligrosidad entre 0 y 1.
+    """
+    num_incidents = np.asarray(num_incidents)
+    avg_gravity = np.asarray(avg_gravity)
+
+    danger = lookup_danger(
+        num_incidents, avg_gravity, risk_zone_distance, time
+    )
+    danger[(num_incidents <= 0) & (avg_gravity <= 0)] = 0.0
+
+    return np.round(danger, 2)
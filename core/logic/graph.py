@@ -1,15 +1,25 @@
 import logging
-from typing import Tuple, Dict
+from itertools import chain
+from typing import Tuple, Dict, List, Optional, Sequence
 
 import networkx as nx
-from django.contrib.gis.geos import Polygon, Point
-from django.contrib.gis.measure import D
+import numpy as np
+from django.contrib.gis.geos import Polygon
 from django.db.models import QuerySet
 from django.utils.timezone import now
-from geopy.distance import geodesic
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import breadth_first_order, dijkstra
+from scipy.spatial import cKDTree
 
 from utils import config
-from .fuzzy import calculate_fuzzy_danger
+from utils.geo import haversine_meters, to_local_meters
+from utils.graph_loader import (
+    get_local_subgraph,
+    get_nearest_nodes,
+    graph_cache,
+    node_arrays,
+)
+from .fuzzy import calculate_fuzzy_danger_batch
 from ..models import Incident
 
 logger = logging.getLogger(__name__)
@@ -33,8 +43,9 @@ def estimate_radius(
     Returns:
         Radio en metros para construir el grafo.
     """
-    distance_km = geodesic(origin, destination).km
-    return min(max(distance_km * 1000 * 1.5, 1000), 3000)
+    points = np.array([origin, destination], dtype=float)
+    distance_m = float(haversine_meters(points[:1], points[1:])[0])
+    return min(max(distance_m * 1.5, 1000), 3000)
 
 
 def parse_coordinates(
@@ -54,33 +65,194 @@ def parse_coordinates(
         raise ValueError("Parámetros inválidos o faltantes") from e
 
 
-def get_incidents_in_graph(graph: nx.MultiDiGraph) -> QuerySet[Incident]:
+def node_coordinates(
+    graph: nx.MultiDiGraph,
+) -> Tuple[Dict[int, int], np.ndarray]:
+    """
+    Extrae las coordenadas de todos los nodos en un solo arreglo.
+
+    Se deriva de ``node_arrays``, sin volver a recorrer los atributos de
+    los nodos, y se guarda aparte por cada objeto de grafo.
+
+    Args:
+        graph: Grafo de calles.
+
+    Returns:
+        Índice de fila de cada nodo y arreglo (N, 2) de coordenadas
+        [lat, lon], con NaN si el nodo no tiene coordenadas.
+    """
+
+    def build():
+        ids, lats, lons = node_arrays(graph)
+        index = {node: i for i, node in enumerate(ids)}
+        return index, np.column_stack((lats, lons))
+
+    return graph_cache(graph, "node_coordinates", build)
+
+
+def edge_index(graph: nx.MultiDiGraph) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Obtiene los índices de fila de los extremos de todas las aristas.
+
+    Sigue el orden de ``graph.edges`` y las filas de ``node_coordinates``.
+    Se guarda por cada objeto de grafo para que el cálculo de riesgos y la
+    búsqueda de ruta no recorran las aristas en Python dos veces.
+
+    Args:
+        graph: Grafo de calles.
+
+    Returns:
+        Arreglos con el índice del nodo de origen y de destino de cada arista.
+    """
+
+    def build():
+        index, _ = node_coordinates(graph)
+        size = graph.number_of_edges()
+        u_idx = np.fromiter(
+            (index[u] for u, _ in graph.edges()), np.intp, size
+        )
+        v_idx = np.fromiter(
+            (index[v] for _, v in graph.edges()), np.intp, size
+        )
+        return u_idx, v_idx
+
+    return graph_cache(graph, "edge_index", build)
+
+
+def has_path(graph: nx.MultiDiGraph, source: int, target: int) -> bool:
     """
-    Obtiene todos los incidentes dentro del área cubierta por el grafo.
+    Comprueba si el destino es alcanzable desde el origen, sin pesos.
 
     Args:
         graph: Grafo de calles.
+        source: Nodo de origen.
+        target: Nodo de destino.
 
     Returns:
-        Lista de incidentes dentro del área del grafo.
+        True si existe un camino dirigido del origen al destino.
     """
-    nodes = list(graph.nodes(data=True))
-    lats = [n[1]["y"] for n in nodes]
-    lons = [n[1]["x"] for n in nodes]
-    bbox = Polygon.from_bbox((min(lons), min(lats), max(lons), max(lats)))
+    index, _ = node_coordinates(graph)
+    u, v = edge_index(graph)
+    matrix = csr_matrix(
+        (np.ones(len(u), dtype=np.int8), (u, v)), shape=(len(index),) * 2
+    )
+    reached = breadth_first_order(
+        matrix, index[source], return_predecessors=False
+    )
+    return bool(np.any(reached == index[target]))
+
+
+def select_route_graph(
+    graph: nx.MultiDiGraph,
+    origin: Tuple[float, float],
+    destination: Tuple[float, float],
+    buffers_m: Sequence[float],
+) -> Optional[Tuple[nx.MultiDiGraph, int, int]]:
+    """
+    Elige el corredor más angosto en el que el destino es alcanzable.
+
+    Solo se comprueba la conectividad en cada corredor, de modo que los
+    riesgos y la búsqueda de ruta se calculan una sola vez sobre el elegido.
+    El grafo completo se usa como último recurso, sin copiarlo.
+
+    Args:
+        graph: Grafo de calles completo.
+        origin: Coordenadas (lat, lon) de origen.
+        destination: Coordenadas (lat, lon) de destino.
+        buffers_m: Márgenes del corredor en metros, de menor a mayor.
+
+    Returns:
+        Grafo elegido con los nodos de origen y destino, o None si no hay
+        camino ni en el grafo completo.
+    """
+    for buffer_m in (*buffers_m, None):
+        if buffer_m is None:
+            candidate = graph
+        else:
+            candidate = get_local_subgraph(
+                graph, origin, destination, buffer_m=buffer_m
+            )
+            if not len(candidate):
+                continue
+
+        source, target = get_nearest_nodes(candidate, [origin, destination])
+        if has_path(candidate, source, target):
+            return candidate, source, target
+        if buffer_m is not None:
+            logger.warning(
+                f"Sin camino con margen de {buffer_m} m. Ampliando."
+            )
+
+    return None
+
+
+def get_incidents_in_bounds(
+    bounds: Tuple[float, float, float, float],
+) -> QuerySet[Incident]:
+    """
+    Obtiene todos los incidentes dentro de un rectángulo.
+
+    Args:
+        bounds: Límites (min_lon, min_lat, max_lon, max_lat).
+
+    Returns:
+        Lista de incidentes dentro del rectángulo.
+    """
+    bbox = Polygon.from_bbox(bounds)
     bbox.srid = 4326  # SRID de Incident.location
-    return Incident.objects.filter(location__within=bbox)
+    # && solo compara cajas envolventes y se resuelve con el índice GiST, sin
+    # la prueba exacta por fila de ST_CoveredBy. Puede devolver algún punto
+    # de más cerca del borde, que la búsqueda por radio de score_edges ignora
+    return Incident.objects.filter(location__bboverlaps=bbox)
+
+
+def index_incidents(
+    incidents: QuerySet[Incident], ref_lat: float
+) -> Tuple[cKDTree | None, np.ndarray, np.ndarray]:
+    """
+    Carga los incidentes en memoria con un índice espacial en metros.
+
+    Args:
+        incidents: Conjunto de incidentes relevantes.
+        ref_lat: Latitud de referencia de la proyección.
+
+    Returns:
+        Árbol espacial (o None si no hay incidentes), gravedades y días
+        transcurridos de cada incidente.
+    """
+    # Las columnas numéricas evitan decodificar una geometría por fila
+    rows = list(
+        incidents.values_list(
+            "latitude", "longitude", "severity", "incident_date"
+        )
+    )
+    if not rows:
+        return None, np.empty(0), np.empty(0)
+
+    lats, lons, severities, dates = zip(*rows)
+    points = to_local_meters(lats, lons, ref_lat)
+    today = np.datetime64(now().date(), "D")
+    ages = today - np.array(dates, dtype="datetime64[D]")
+
+    return (
+        cKDTree(points),
+        np.array(severities, dtype=float),
+        ages.astype(float),
+    )
 
 
-def assign_edge_risks(
+def score_edges(
     graph: nx.MultiDiGraph,
     incidents: QuerySet[Incident],
     risk_radius: int = risk_radius,
     weight_security: float = weight_security,
     speed_mps: float = 50 / 3.6,
-) -> None:
+) -> Tuple[np.ndarray, np.ndarray]:
     """
-    Asigna valores de riesgo y costo combinado a cada arista del grafo.
+    Calcula el riesgo y el costo combinado de cada arista del grafo.
+
+    El grafo no se modifica, por lo que puede ser el grafo compartido en
+    caché; los resultados siguen el orden de ``edge_index``.
 
     Args:
         graph: Grafo de calles.
@@ -88,39 +260,171 @@ def assign_edge_risks(
         risk_radius: Radio de influencia para calcular riesgo.
         weight_security: Peso relativo de la seguridad.
         speed_mps: Velocidad asumida en metros por segundo.
+
+    Returns:
+        Arreglos con el riesgo y el costo combinado de cada arista.
     """
-    for u, v, k, data in graph.edges(keys=True, data=True):
-        try:
-            u_lat, u_lon = graph.nodes[u]["y"], graph.nodes[u]["x"]
-            v_lat, v_lon = graph.nodes[v]["y"], graph.nodes[v]["x"]
-            midpoint = Point(
-                (u_lon + v_lon) / 2, (u_lat + v_lat) / 2, srid=4326
-            )
+    edges = list(graph.edges(data="length", default=np.nan))
+    if not edges:
+        return np.empty(0), np.empty(0)
 
-            data["length"] = geodesic((u_lat, u_lon), (v_lat, v_lon)).meters
-            nearby = incidents.filter(
-                location__distance_lte=(midpoint, D(m=risk_radius))
-            )
+    # Coordenadas de los extremos y puntos medios de todas las aristas
+    _, coords = node_coordinates(graph)
+    u_idx, v_idx = edge_index(graph)
+    u_coords, v_coords = coords[u_idx], coords[v_idx]
+    midpoints = (u_coords + v_coords) / 2
+    valid = np.isfinite(midpoints).all(axis=1)
+    ref_lat = float(midpoints[valid, 0].mean()) if valid.any() else 0.0
 
-            if nearby:
-                avg_severity = sum(i.severity for i in nearby) / len(nearby)
-                avg_time = sum(
-                    (now().date() - i.incident_date).days for i in nearby
-                ) / len(nearby)
-                risk = calculate_fuzzy_danger(
-                    len(nearby), avg_severity, risk_radius, avg_time
-                )
-            else:
-                risk = 0.0
-
-            time = data["length"] / speed_mps
-            data["risk"] = risk
-            data["combined_cost"] = (risk * weight_security) + (
-                time * (1 - weight_security)
-            )
+    # Una sola consulta y búsqueda por radio para todas las aristas; sin
+    # incidentes se omite la búsqueda y todas las aristas quedan en cero
+    tree, severities, ages = index_incidents(incidents, ref_lat)
+    risks = np.zeros(len(edges))
+    if tree is not None:
+        neighbors = tree.query_ball_point(
+            to_local_meters(midpoints[valid, 0], midpoints[valid, 1], ref_lat),
+            r=risk_radius,
+        )
+
+        # Agregados por arista: conteo, gravedad y antigüedad promedio
+        counts = np.zeros(len(edges), dtype=int)
+        counts[valid] = np.fromiter(map(len, neighbors), dtype=int)
+        owners = np.repeat(np.arange(len(edges)), counts)
+        members = np.fromiter(
+            chain.from_iterable(neighbors), dtype=int, count=counts.sum()
+        )
+        divisor = np.maximum(counts, 1)
+        mean_severity = (
+            np.bincount(owners, severities[members], minlength=len(edges))
+            / divisor
+        )
+        mean_age = (
+            np.bincount(owners, ages[members], minlength=len(edges)) / divisor
+        )
+
+        # Inferencia difusa solo sobre las aristas con incidentes cercanos
+        nearby = counts > 0
+        risks[nearby] = calculate_fuzzy_danger_batch(
+            counts[nearby],
+            mean_severity[nearby],
+            risk_radius,
+            mean_age[nearby],
+        )
+
+    # Longitud que ya trae OSMnx (medida sobre la geometría de la calle);
+    # haversine entre extremos solo para las aristas que no la tienen
+    lengths = np.fromiter(
+        (length for _, _, length in edges), float, len(edges)
+    )
+    missing = np.isnan(lengths)
+    lengths[missing] = haversine_meters(u_coords[missing], v_coords[missing])
+
+    # Costo combinado de todas las aristas en una sola operación
+    times = lengths / speed_mps
+    costs = risks * weight_security + times * (1 - weight_security)
+
+    # Las aristas con coordenadas inválidas quedan intransitables
+    invalid = ~(np.isfinite(lengths) & np.isfinite(costs))
+    if invalid.any():
+        logger.warning(f"{invalid.sum()} aristas con datos inválidos.")
+        risks[invalid] = 0.0
+        costs[invalid] = np.inf
+
+    return risks, costs
+
+
+def shortest_route(
+    graph: nx.MultiDiGraph,
+    source: int,
+    target: int,
+    weight: str | np.ndarray = "length",
+) -> List[int]:
+    """
+    Calcula la ruta de menor costo con el Dijkstra compilado de SciPy.
+
+    Entre aristas paralelas se usa la de menor peso; las aristas con peso
+    infinito o sin peso se consideran intransitables.
+
+    Args:
+        graph: Grafo de calles.
+        source: Nodo de origen.
+        target: Nodo de destino.
+        weight: Atributo de las aristas usado como costo, o arreglo de
+            costos en el orden de ``edge_index``.
+
+    Returns:
+        Lista de nodos de la ruta, del origen al destino.
+
+    Raises:
+        nx.NetworkXNoPath: Si no existe ruta entre los nodos.
+    """
+    index, _ = node_coordinates(graph)
+    nodes = list(index)
+    u, v = edge_index(graph)
+    if isinstance(weight, np.ndarray):
+        w = weight
+    else:
+        w = np.fromiter(
+            (w for _, _, w in graph.edges(data=weight, default=np.inf)),
+            float,
+            len(u),
+        )
+
+    # Una entrada por par de nodos: la arista paralela más barata
+    order = np.lexsort((w, v, u))
+    u, v, w = u[order], v[order], w[order]
+    keep = np.isfinite(w)
+    keep[1:] &= (u[1:] != u[:-1]) | (v[1:] != v[:-1])
+    matrix = csr_matrix((w[keep], (u[keep], v[keep])), shape=(len(nodes),) * 2)
+
+    distances, predecessors = dijkstra(
+        matrix, indices=index[source], return_predecessors=True
+    )
+    if not np.isfinite(distances[index[target]]):
+        raise nx.NetworkXNoPath(f"No hay ruta entre {source} y {target}.")
+
+    # Reconstrucción de la ruta desde el destino
+    route = [index[target]]
+    while route[-1] != index[source]:
+        route.append(predecessors[route[-1]])
+
+    return [nodes[i] for i in reversed(route)]
+
+
+def route_danger(
+    graph: nx.MultiDiGraph,
+    route: List[int],
+    risks: np.ndarray,
+    costs: np.ndarray,
+) -> float:
+    """
+    Obtiene el riesgo máximo de las aristas que recorre una ruta.
+
+    Entre aristas paralelas se toma la de menor costo, que es la que usa
+    ``shortest_route``.
+
+    Args:
+        graph: Grafo de calles.
+        route: Lista de nodos de la ruta.
+        risks: Riesgo de cada arista en el orden de ``edge_index``.
+        costs: Costo de cada arista en el orden de ``edge_index``.
+
+    Returns:
+        Riesgo máximo de la ruta, o 0.0 si no recorre ninguna arista.
+    """
+    index, _ = node_coordinates(graph)
+    u, v = edge_index(graph)
+
+    # Cada arista como una sola clave entera (origen, destino)
+    nodes = np.fromiter((index[n] for n in route), np.intp, len(route))
+    hops = nodes[:-1] * len(index) + nodes[1:]
+    keys = u * len(index) + v
+    on_route = np.flatnonzero(np.isin(keys, hops))
+    if not len(on_route):
+        return 0.0
 
-        except Exception as e:
-            logger.warning(f"Error al procesar arista {u}-{v}: {e}")
-            data["length"] = 1.0
-            data["risk"] = 0.0
-            data["combined_cost"] = float("inf")
+    # La arista paralela más barata de cada tramo, igual que en la búsqueda
+    order = on_route[np.lexsort((costs[on_route], keys[on_route]))]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = keys[order][1:] != keys[order][:-1]
+    return float(risks[order[first]].max())
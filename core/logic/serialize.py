@@ -1,11 +1,16 @@
-import json
 import logging
 from typing import List, Tuple
 
+import numpy as np
+import orjson
+
 from core.models import Incident
 
 logger = logging.getLogger(__name__)
 
+# Etiquetas de los tipos de incidente, sin pasar por get_type_display
+TYPE_DISPLAY = dict(Incident.INCIDENT_TYPE)
+
 
 def serialize_incidents(incidents=None, json_dump=True):
     incidents = (
@@ -13,26 +18,42 @@ def serialize_incidents(incidents=None, json_dump=True):
         if incidents is None
         else incidents
     )
+    rows = incidents.values_list(
+        "id",
+        "latitude",
+        "longitude",
+        "severity",
+        "type",
+        "incident_date",
+        "description",
+    )
     incidents_data = [
         {
-            "id": i.id,
-            "geometry": i.location.geojson,
-            "lat": i.latitude,
-            "lon": i.longitude,
-            "severity": i.severity,
-            "type": i.get_type_display(),
-            "date": str(i.incident_date),
-            "description": i.description or "Sin descripción",
+            "id": incident_id,
+            "lat": round(lat, 6),
+            "lon": round(lon, 6),
+            "severity": severity,
+            "type": TYPE_DISPLAY.get(kind, kind),
+            "date": str(date),
+            "description": description or "Sin descripción",
         }
-        for i in incidents
+        for (
+            incident_id,
+            lat,
+            lon,
+            severity,
+            kind,
+            date,
+            description,
+        ) in rows.iterator(chunk_size=2000)
     ]
-    logger.info(
-        f"Serializando la información de incidentes:\n{incidents_data}"
-    )
+    logger.info("Serializando %d incidentes.", len(incidents_data))
     return {
         "incidents": incidents,
         "incidents_json": (
-            json.dumps(incidents_data) if json_dump else incidents_data
+            orjson.dumps(incidents_data).decode()
+            if json_dump
+            else incidents_data
         ),
     }
 
@@ -50,11 +71,13 @@ def build_geojson(
     Returns:
         Objeto GeoJSON con la geometría de la ruta.
     """
+    # GeoJSON usa el orden [lon, lat]
+    coordinates = np.asarray(route_coords, dtype=float)[:, ::-1]
     return {
         "type": "Feature",
         "geometry": {
             "type": "LineString",
-            "coordinates": [(lon, lat) for lat, lon in route_coords],
+            "coordinates": coordinates.tolist(),
         },
         "properties": {"dangerLevel": danger_level},
     }
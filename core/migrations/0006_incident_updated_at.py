@@ -0,0 +1,20 @@
+# Generated by Django 5.2 on 2026-10-15 12:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_auto_20250427_0718'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='incident',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -24,6 +24,7 @@ class Incident(models.Model):
 
     report_date = models.DateField(auto_now_add=True)
     report_time = models.TimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     incident_date = models.DateField()
     incident_time = models.TimeField()
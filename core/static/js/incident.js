@@ -14,9 +14,13 @@ function getIncidents() {
     }
 }
 
+// Un solo lienzo compartido por todos los marcadores, en lugar de un nodo SVG por incidente
+const incidentRenderer = L.canvas({padding: 0.5});
+
 function createIncidentMarker(incident) {
     const markerColor = getColor(incident.severity, [0, 1, 2, 3, 4, 5]);
     return L.circleMarker([incident.lat, incident.lon], {
+        renderer: incidentRenderer,
         color: markerColor,
         fillColor: markerColor,
         fillOpacity: 0.6,
@@ -105,13 +105,13 @@ function calculateRoute(map, state, dangerTextEl) {
         .then(response => response.json())
         .then(data => {
             document.getElementById("loadingSpinner").classList.add("hidden");
-            if (!data.route) {
+            if (!data.geojson) {
                 alert("No se pudo calcular la ruta.");
                 return;
             }
 
             // Verifica el valor de 'dangerLevel' que llega en la respuesta
-            console.log("Primeros puntos de la ruta:", data.route.slice(0, 5));
+            console.log("Primeros puntos de la ruta:", data.geojson.geometry.coordinates.slice(0, 5));
             console.log('Nivel de peligrosidad:', data.dangerLevel);
             console.log('Incidentes:', data.incidents);
 
@@ -1,31 +1,70 @@
 # core.views.py
 
 import logging
+from datetime import date, datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, Tuple
 
 import networkx as nx
-import osmnx as ox
+import orjson
 from django.contrib import messages
-from django.http import HttpResponse
-from django.http import JsonResponse, HttpRequest
+from django.db.models import Count, Max
+from django.http import HttpResponse, HttpRequest
 from django.shortcuts import render, redirect
+from django.utils.timezone import now
 from django.views.decorators.csrf import csrf_exempt
 
 from utils.graph_loader import (
     save_dynamic_graph,
     find_graph_for_route,
-    get_local_subgraph,
+    graph_bounds,
+    load_graph,
 )
 from .forms import IncidentForm
+from .models import Incident
 from .logic.graph import (
     parse_coordinates,
     estimate_radius,
-    assign_edge_risks,
-    get_incidents_in_graph,
+    score_edges,
+    get_incidents_in_bounds,
+    node_coordinates,
+    select_route_graph,
+    shortest_route,
+    route_danger,
 )
 from .logic.serialize import serialize_incidents, build_geojson
 
 logger = logging.getLogger(__name__)
 
+INCIDENT_LIST_LIMIT = 500
+
+# Rutas guardadas por proceso; cada una ocupa unos pocos KB
+ROUTE_CACHE_SIZE = 256
+
+NO_ROUTE_MESSAGE = "No se encontró una ruta segura entre los puntos."
+
+# Márgenes del corredor alrededor de origen y destino, en metros
+SUBGRAPH_BUFFERS_M = (2000, 4000, 8000)
+
+
+def _json_response(data: dict, status: int = 200) -> HttpResponse:
+    """
+    Serializa una respuesta JSON con orjson en lugar del codificador estándar.
+
+    Args:
+        data: Contenido de la respuesta; admite arreglos de NumPy.
+        status: Código de estado HTTP.
+
+    Returns:
+        Respuesta HTTP con tipo de contenido JSON.
+    """
+    return HttpResponse(
+        orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY),
+        content_type="application/json",
+        status=status,
+    )
+
 
 def home(request: HttpRequest) -> HttpResponse:
     return render(request, "mapa.html")
@@ -47,24 +86,114 @@ def add_incident(request: HttpRequest) -> HttpResponse:
 
 
 def incident_list(request: HttpRequest) -> HttpResponse:
+    # Los más recientes primero; "-id" desempata para que la tabla y los
+    # marcadores (dos consultas) conserven el mismo orden
+    incidents = (
+        Incident.objects.exclude(latitude=0, longitude=0)
+        .only(
+            "type",
+            "description",
+            "incident_date",
+            "incident_time",
+            "severity",
+            "status",
+        )
+        .order_by("-incident_date", "-incident_time", "-id")
+    )
     return render(
         request,
         "incident_list.html",
-        serialize_incidents(),
+        serialize_incidents(incidents[:INCIDENT_LIST_LIMIT]),
+    )
+
+
+def _incidents_version() -> Tuple[int, Optional[datetime], date]:
+    """
+    Obtiene una versión barata del estado de los incidentes.
+
+    Cambia al registrar, editar o borrar incidentes y cada día, ya que el
+    riesgo depende de la antigüedad de los incidentes.
+
+    Returns:
+        Número de incidentes, última modificación y fecha actual.
+    """
+    stats = Incident.objects.aggregate(
+        count=Count("id"), last=Max("updated_at")
+    )
+    return stats["count"], stats["last"], now().date()
+
+
+@lru_cache(maxsize=ROUTE_CACHE_SIZE)
+def _route(
+    graph_path: Path,
+    origin: Tuple[float, float],
+    destination: Tuple[float, float],
+    weight_security: float,
+    incidents_version: Tuple[int, Optional[datetime], date],
+) -> Optional[Tuple[float, dict, Tuple[float, float, float, float]]]:
+    """
+    Calcula la ruta más segura entre dos puntos.
+
+    El resultado se guarda en caché por grafo, puntos cuantizados, peso de
+    seguridad y versión de los incidentes. Solo se guarda la ruta, no los
+    incidentes, para que cada entrada ocupe poco.
+
+    Args:
+        graph_path: Archivo del grafo que contiene ambos puntos.
+        origin: Coordenadas (lat, lon) de origen.
+        destination: Coordenadas (lat, lon) de destino.
+        weight_security: Peso relativo de la seguridad.
+        incidents_version: Versión de los incidentes, solo para la caché.
+
+    Returns:
+        Nivel de peligro, GeoJSON de la ruta y límites del grafo usado, o
+        None si no hay ruta entre los puntos.
+    """
+    # Corredores cada vez más anchos; el grafo completo como último recurso
+    selected = select_route_graph(
+        load_graph(graph_path), origin, destination, SUBGRAPH_BUFFERS_M
     )
+    if selected is None:
+        return None
+    subgraph, origin_node, dest_node = selected
+
+    logger.info(
+        f"Subgrafo: {len(subgraph)} nodos, "
+        f"{subgraph.number_of_edges()} aristas"
+    )
+    logger.info(f"Nodo origen: {origin_node}, destino: {dest_node}")
+
+    # Asignar riesgos y calcular ruta
+    bounds = graph_bounds(subgraph)
+    risks, costs = score_edges(
+        subgraph,
+        get_incidents_in_bounds(bounds),
+        weight_security=weight_security,
+    )
+    try:
+        route = shortest_route(subgraph, origin_node, dest_node, costs)
+    except nx.NetworkXNoPath:
+        return None
+
+    index, coords = node_coordinates(subgraph)
+    route_coords = coords[[index[n] for n in route]]
+    danger_level = route_danger(subgraph, route, risks, costs)
+
+    return danger_level, build_geojson(route_coords, danger_level), bounds
 
 
 @csrf_exempt
-def calculate_route(request: HttpRequest) -> JsonResponse:
+def calculate_route(request: HttpRequest) -> HttpResponse:
     if request.method != "POST":
-        return JsonResponse({"error": "Método no permitido"}, status=405)
+        return _json_response({"error": "Método no permitido"}, status=405)
 
     try:
         origin_lat, origin_lon, dest_lat, dest_lon = parse_coordinates(
             request.POST
         )
-        origin = (origin_lat, origin_lon)
-        destination = (dest_lat, dest_lon)
+        # Cuantizadas a ~1 m para que solicitudes casi iguales compartan caché
+        origin = (round(origin_lat, 5), round(origin_lon, 5))
+        destination = (round(dest_lat, 5), round(dest_lon, 5))
         center = (
             (origin[0] + destination[0]) / 2,
             (origin[1] + destination[1]) / 2,
@@ -82,16 +211,15 @@ def calculate_route(request: HttpRequest) -> JsonResponse:
 
         if graph_path:
             logger.info(f"✅ Usando grafo en caché: {graph_path.name}")
-            graph = ox.load_graphml(graph_path)
         else:
             logger.info("📍 No se encontró grafo en caché. Descargando...")
             try:
                 graph_path = save_dynamic_graph(center, radius_m)
-                graph = ox.load_graphml(graph_path)
+                load_graph(graph_path)
                 logger.info(f"✅ Grafo dinámico guardado: {graph_path.name}")
             except Exception as e:
                 logger.error(f"❌ Error al descargar grafo: {e}")
-                return JsonResponse(
+                return _json_response(
                     {
                         "error": "No se pudo obtener el grafo de la zona solicitada.",
                         "details": str(e),
@@ -99,90 +227,35 @@ def calculate_route(request: HttpRequest) -> JsonResponse:
                     status=503,
                 )
 
-        # Intentar recortar el grafo
-        try:
-            subgraph = get_local_subgraph(graph, origin, destination)
-
-            # Verificar que ambos nodos estén en el subgrafo
-            origin_node = ox.distance.nearest_nodes(
-                subgraph, origin[1], origin[0]
-            )
-            dest_node = ox.distance.nearest_nodes(
-                subgraph, destination[1], destination[0]
-            )
-
-            if (
-                origin_node not in subgraph.nodes
-                or dest_node not in subgraph.nodes
-            ):
-                logger.warning(
-                    "Subgrafo no contiene ambos nodos. Usando grafo completo."
-                )
-                subgraph = graph
-                origin_node = ox.distance.nearest_nodes(
-                    graph, origin[1], origin[0]
-                )
-                dest_node = ox.distance.nearest_nodes(
-                    graph, destination[1], destination[0]
-                )
-        except Exception as e:
-            logger.warning(
-                f"Error al recortar grafo: {e}. Usando grafo completo."
-            )
-            subgraph = graph
-            origin_node = ox.distance.nearest_nodes(
-                graph, origin[1], origin[0]
-            )
-            dest_node = ox.distance.nearest_nodes(
-                graph, destination[1], destination[0]
-            )
-
-        # Asignar riesgos y calcular ruta
-        incidents = get_incidents_in_graph(subgraph)
-        assign_edge_risks(subgraph, incidents, weight_security=weight_security)
-
-        logger.info(
-            f"Subgrafo: {len(subgraph.nodes)} nodos, {len(subgraph.edges)} aristas"
+        result = _route(
+            graph_path,
+            origin,
+            destination,
+            weight_security,
+            _incidents_version(),
         )
-        logger.info(f"Nodo origen: {origin_node}, destino: {dest_node}")
-
-        try:
-            route = nx.astar_path(
-                subgraph, origin_node, dest_node, weight="combined_cost"
-            )
-        except nx.NetworkXNoPath:
-            return JsonResponse(
+        if result is None:
+            return _json_response(
                 {
-                    "route": None,
                     "dangerLevel": 0.0,
                     "geojson": None,
-                    "message": "No se encontró una ruta segura entre los puntos.",
+                    "message": NO_ROUTE_MESSAGE,
                 }
             )
 
-        route_coords = [
-            (subgraph.nodes[n]["y"], subgraph.nodes[n]["x"]) for n in route
-        ]
-        risks = [
-            subgraph[u][v][k].get("risk", 0.0)
-            for u, v in zip(route[:-1], route[1:])
-            for k in subgraph[u][v]
-        ]
-        danger_level = max(risks) if risks else 0.0
-
-        return JsonResponse(
+        danger_level, geojson, bounds = result
+        return _json_response(
             {
-                "route": route_coords,
                 "dangerLevel": danger_level,
-                "geojson": build_geojson(route_coords, danger_level),
-                "incidents": serialize_incidents(incidents, json_dump=False)[
-                    "incidents_json"
-                ],
+                "geojson": geojson,
+                "incidents": serialize_incidents(
+                    get_incidents_in_bounds(bounds), json_dump=False
+                )["incidents_json"],
             }
         )
 
     except Exception:
         logger.exception("Error inesperado al calcular la ruta")
-        return JsonResponse(
+        return _json_response(
             {"error": "Error interno del servidor"}, status=500
         )
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from core.logic import fuzzy
+from core.logic.fuzzy import calculate_fuzzy_danger, simulate_fuzzy_danger
+
+
+@pytest.mark.parametrize(
+    "inputs",
+    [
+        (1, 1.0, 0, 0),
+        (3, 2.5, 40, 10),
+        (12, 4.2, 85, 45),
+        (30, 3.7, 15, 3),
+        (50, 5.0, 100, 60),
+    ],
+)
+def test_lookup_table_matches_simulation(inputs):
+    # La tabla precalculada debe coincidir con la simulación de referencia
+    assert calculate_fuzzy_danger(*inputs) == pytest.approx(
+        simulate_fuzzy_danger(*inputs), abs=0.02
+    )
+
+
+def test_no_incidents_is_safe():
+    assert calculate_fuzzy_danger(0, 0, 100, 0) == 0.0
+
+
+def test_truncated_lookup_table_is_rebuilt(tmp_path, monkeypatch):
+    # Una tabla a medio escribir no debe romper la carga
+    path = tmp_path / "danger_lut.npy"
+    path.write_bytes(b"\x93NUMPY\x01\x00")
+    monkeypatch.setattr(fuzzy, "LUT_PATH", path)
+    monkeypatch.delenv("NAVI_REBUILD_FUZZY_LUT", raising=False)
+
+    lut = fuzzy.load_danger_lut()
+
+    assert lut.shape == np.load(path).shape
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def random_inputs(size, seed):
+    rng = np.random.default_rng(seed)
+    return np.column_stack(
+        (
+            rng.integers(1, 51, size),
+            rng.uniform(1, 5, size),
+            rng.uniform(0, 100, size),
+            rng.uniform(0, 60, size),
+        )
+    )
+
+
+def test_vectorized_inference_matches_simulation():
+    # El evaluador vectorizado reproduce a scikit-fuzzy sin redondeo
+    inputs = random_inputs(200, seed=0)
+    simulator = fuzzy.get_simulator()
+    expected = []
+    for values in inputs:
+        simulator.inputs(dict(zip(fuzzy.CATEGORIES, values)))
+        simulator.compute()
+        expected.append(simulator.output["danger"])
+
+    assert fuzzy.infer_fuzzy_danger(*inputs.T) == pytest.approx(
+        expected, abs=1e-3
+    )
+
+
+def test_lookup_table_error_is_bounded():
+    # La interpolación sobre la rejilla de la tabla domina el error
+    inputs = random_inputs(200, seed=1)
+    expected = [simulate_fuzzy_danger(*values) for values in inputs]
+
+    assert fuzzy.calculate_fuzzy_danger_batch(*inputs.T) == pytest.approx(
+        expected, abs=0.05
+    )
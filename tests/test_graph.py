@@ -0,0 +1,209 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from core.logic.graph import (
+    edge_index,
+    has_path,
+    node_coordinates,
+    route_danger,
+    score_edges,
+    select_route_graph,
+    shortest_route,
+)
+from core.models import Incident
+
+
+def line_graph(size=5):
+    # Nodos en línea, unidos en ambos sentidos
+    graph = nx.MultiDiGraph()
+    for i in range(size):
+        graph.add_node(i, y=19.4 + i * 0.001, x=-99.15)
+    for i in range(size - 1):
+        graph.add_edge(i, i + 1, length=100.0)
+        graph.add_edge(i + 1, i, length=100.0)
+    return graph
+
+
+def test_subgraph_does_not_reuse_parent_arrays():
+    graph = line_graph()
+    parent_index, parent_coords = node_coordinates(graph)
+    parent_u, _ = edge_index(graph)
+
+    sub = graph.subgraph([2, 3, 4]).copy()
+    index, coords = node_coordinates(sub)
+    u, v = edge_index(sub)
+
+    assert index is not parent_index and coords is not parent_coords
+    assert list(index) == [2, 3, 4]
+    assert np.allclose(coords[:, 0], [19.402, 19.403, 19.404])
+    assert len(u) == sub.number_of_edges() != len(parent_u)
+    nodes = list(index)
+    assert [(nodes[a], nodes[b]) for a, b in zip(u, v)] == list(sub.edges())
+    assert not sub.graph
+
+
+def test_scoring_does_not_modify_the_graph():
+    graph = line_graph()
+    del graph.edges[0, 1, 0]["length"]
+    before = [dict(data) for _, _, data in graph.edges(data=True)]
+
+    risks, costs = score_edges(
+        graph, Incident.objects.none(), weight_security=0.5, speed_mps=10
+    )
+
+    # Sin incidentes el costo es solo el tiempo; la longitud faltante se
+    # estima entre los extremos (~111 m)
+    assert [dict(data) for _, _, data in graph.edges(data=True)] == before
+    assert not graph.graph
+    assert np.all(risks == 0)
+    assert costs[1:] == pytest.approx(100 / 10 * 0.5)
+    assert costs[0] == pytest.approx(111.2 / 10 * 0.5, rel=1e-3)
+
+    route = shortest_route(graph, 0, 4, costs)
+    assert route == [0, 1, 2, 3, 4]
+    assert route_danger(graph, route, risks, costs) == 0.0
+
+
+def random_graph(seed, size=30, edges=120):
+    # Grafo con aristas paralelas, pesos cero y algunas infinitas
+    rng = np.random.default_rng(seed)
+    graph = nx.MultiDiGraph()
+    graph.add_nodes_from(range(size))
+    for _ in range(edges):
+        u, v = map(int, rng.integers(0, size, 2))
+        weight = float(rng.choice([0.0, rng.uniform(1, 10), np.inf]))
+        graph.add_edge(u, v, length=weight)
+    return graph
+
+
+def nx_reference(graph, source, target):
+    # Referencia: NetworkX con la arista paralela más barata y sin infinitas
+    def weight(u, v, edges):
+        cost = min(data["length"] for data in edges.values())
+        return cost if np.isfinite(cost) else None
+
+    return nx.dijkstra_path(graph, source, target, weight=weight)
+
+
+def simple_graph(graph):
+    # Colapsa las aristas paralelas a la más barata
+    simple = nx.DiGraph()
+    for u, v, length in graph.edges(data="length"):
+        if not simple.has_edge(u, v) or length < simple[u][v]["length"]:
+            simple.add_edge(u, v, length=length)
+    return simple
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_shortest_route_matches_networkx(seed):
+    graph = random_graph(seed)
+    simple = simple_graph(graph)
+
+    for source, target in [(0, 1), (2, 7), (5, 29)]:
+        try:
+            expected = nx_reference(graph, source, target)
+        except nx.NetworkXNoPath:
+            with pytest.raises(nx.NetworkXNoPath):
+                shortest_route(graph, source, target)
+            continue
+
+        route = shortest_route(graph, source, target)
+        # Puede haber empates: se compara el costo, no la secuencia
+        assert route[0] == source and route[-1] == target
+        assert nx.path_weight(simple, route, "length") == pytest.approx(
+            nx.path_weight(simple, expected, "length")
+        )
+
+
+def test_parallel_edges_use_the_cheapest():
+    graph = line_graph(3)
+    graph.add_edge(0, 2, length=500.0)
+    graph.add_edge(0, 2, length=50.0)
+
+    assert shortest_route(graph, 0, 2) == [0, 2]
+
+
+def test_zero_weight_edges_are_traversable():
+    graph = line_graph(3)
+    graph.add_edge(0, 2, length=0.0)
+
+    assert shortest_route(graph, 0, 2) == [0, 2]
+
+
+def test_infinite_edges_are_not_traversable():
+    graph = line_graph(3)
+    graph.add_edge(0, 2, length=np.inf)
+
+    assert shortest_route(graph, 0, 2) == [0, 1, 2]
+
+
+def test_unreachable_target_raises():
+    graph = line_graph(3)
+    graph.add_node(9, y=19.5, x=-99.1)
+
+    with pytest.raises(nx.NetworkXNoPath):
+        shortest_route(graph, 0, 9)
+
+
+def test_route_danger_uses_the_traversed_parallel_edge():
+    graph = line_graph(3)
+    graph.add_edge(1, 2, length=500.0)
+    risky = list(graph.edges(keys=True)).index((1, 2, 1))
+    risks = np.zeros(graph.number_of_edges())
+    risks[risky] = 0.7
+    costs = np.fromiter(
+        (length for _, _, length in graph.edges(data="length")), float
+    )
+
+    # La calle riesgosa es más larga: la ruta no la usa
+    assert route_danger(graph, [0, 1, 2], risks, costs) == 0.0
+
+    costs[risky] = 10.0
+    assert route_danger(graph, [0, 1, 2], risks, costs) == 0.7
+    assert route_danger(graph, [2, 1, 0], risks, costs) == 0.0
+
+
+def detour_graph():
+    # Los extremos solo se conectan por un nodo a ~11 km del corredor
+    graph = nx.MultiDiGraph()
+    graph.add_node(0, y=19.4, x=-99.15)
+    graph.add_node(1, y=19.401, x=-99.15)
+    graph.add_node(2, y=19.5, x=-99.15)
+    graph.add_edge(0, 2, length=11_000.0)
+    graph.add_edge(2, 1, length=11_000.0)
+    return graph
+
+
+def test_has_path_follows_edge_direction():
+    graph = detour_graph()
+
+    assert has_path(graph, 0, 1)
+    assert not has_path(graph, 1, 0)
+
+
+def test_narrowest_connected_corridor_is_selected():
+    graph = line_graph(10)
+    graph.add_node(99, y=19.6, x=-99.15)
+
+    subgraph, source, target = select_route_graph(
+        graph, (19.4, -99.15), (19.402, -99.15), (500,)
+    )
+
+    assert (source, target) == (0, 2)
+    assert 99 not in subgraph and subgraph is not graph
+
+
+def test_full_graph_is_the_last_resort():
+    graph = detour_graph()
+
+    subgraph, source, target = select_route_graph(
+        graph, (19.4, -99.15), (19.401, -99.15), (100, 200)
+    )
+
+    assert subgraph is graph
+    assert (source, target) == (0, 1)
+    assert (
+        select_route_graph(graph, (19.401, -99.15), (19.4, -99.15), (100,))
+        is None
+    )
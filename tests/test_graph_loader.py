@@ -0,0 +1,93 @@
+import networkx as nx
+import numpy as np
+
+from utils.geo import haversine_meters
+from utils.graph_loader import (
+    get_local_subgraph,
+    get_nearest_nodes,
+    node_arrays,
+    node_tree,
+)
+
+
+def grid_graph(size=20, step=0.001, lat=19.4, lon=-99.15):
+    # Cuadrícula de size x size nodos separados por step grados
+    graph = nx.MultiDiGraph()
+    for i in range(size):
+        for j in range(size):
+            graph.add_node(i * size + j, y=lat + i * step, x=lon + j * step)
+    return graph
+
+
+def test_corridor_keeps_margin_around_endpoints():
+    graph = grid_graph()
+    origin, destination = (19.405, -99.145), (19.406, -99.144)
+
+    # 0.001° de latitud son ~111 m: el margen de 150 m alcanza un nodo más
+    sub = get_local_subgraph(graph, origin, destination, buffer_m=150)
+    _, lats, _ = node_arrays(sub)
+
+    assert np.isclose(lats.min(), 19.4 + 4 * 0.001)
+    assert np.isclose(lats.max(), 19.4 + 7 * 0.001)
+    assert 0 < len(sub) < len(graph)
+
+
+def test_corridor_margin_grows_with_route_length():
+    graph = grid_graph()
+    origin, destination = (19.4, -99.15), (19.406, -99.15)
+
+    # Con 6 nodos de distancia el 30% (~200 m) supera al buffer de 10 m
+    sub = get_local_subgraph(graph, origin, destination, buffer_m=10)
+    _, lats, _ = node_arrays(sub)
+
+    assert np.isclose(lats.max(), 19.4 + 7 * 0.001)
+
+
+def test_large_buffer_returns_the_whole_graph():
+    graph = grid_graph()
+    sub = get_local_subgraph(
+        graph, (19.405, -99.145), (19.406, -99.144), buffer_m=10_000
+    )
+
+    assert set(sub.nodes) == set(graph.nodes)
+
+
+def test_nearest_node_matches_brute_force():
+    rng = np.random.default_rng(0)
+    graph = nx.MultiDiGraph()
+    for i in range(500):
+        graph.add_node(
+            i, y=19.3 + rng.uniform(0, 0.2), x=-99.2 + rng.uniform(0, 0.2)
+        )
+    points = [
+        (19.3 + rng.uniform(0, 0.2), -99.2 + rng.uniform(0, 0.2))
+        for _ in range(50)
+    ]
+
+    ids, lats, lons = node_arrays(graph)
+    nodes = np.column_stack((lats, lons))
+    expected = [
+        ids[np.argmin(haversine_meters(nodes, np.tile(point, (len(ids), 1))))]
+        for point in points
+    ]
+
+    assert get_nearest_nodes(graph, points) == expected
+
+
+def test_subgraph_does_not_reuse_parent_arrays():
+    graph = grid_graph()
+    graph.graph["crs"] = "epsg:4326"
+    before = dict(graph.graph)
+    parent_tree, _ = node_tree(graph)
+
+    sub = get_local_subgraph(graph, (19.405, -99.145), (19.406, -99.144), 150)
+    tree, ids = node_tree(sub)
+
+    # El subgrafo y la copia construyen su propio árbol; el padre conserva
+    # el suyo y sus atributos quedan intactos
+    assert tree is not parent_tree
+    assert len(ids) == len(sub) == tree.n
+    assert node_arrays(sub)[0] is not node_arrays(graph)[0]
+    assert node_tree(graph.copy())[0] is not parent_tree
+    assert node_tree(graph)[0] is parent_tree
+    assert graph.graph == before == sub.graph
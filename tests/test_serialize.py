@@ -0,0 +1,49 @@
+from datetime import date, time
+
+import numpy as np
+import orjson
+import pytest
+from django.contrib.gis.geos import Point
+
+from core.logic.serialize import build_geojson, serialize_incidents
+from core.models import Incident
+
+
+def test_geojson_uses_lon_lat_order():
+    route_coords = np.array([[19.4, -99.15], [19.401, -99.149]])
+
+    geojson = build_geojson(route_coords, 0.25)
+
+    assert geojson["geometry"] == {
+        "type": "LineString",
+        "coordinates": [[-99.15, 19.4], [-99.149, 19.401]],
+    }
+    assert geojson["properties"] == {"dangerLevel": 0.25}
+
+
+def test_geojson_accepts_a_list_of_tuples():
+    geojson = build_geojson([(19.4, -99.15)], 0.0)
+
+    assert geojson["geometry"]["coordinates"] == [[-99.15, 19.4]]
+
+
+@pytest.mark.django_db
+def test_incident_coordinates_are_rounded():
+    Incident.objects.create(
+        type="robbery",
+        description=None,
+        incident_date=date(2024, 1, 1),
+        incident_time=time(12, 0),
+        latitude=19.123456789,
+        longitude=-99.987654321,
+        location=Point(-99.987654321, 19.123456789),  # lon, lat
+        severity=3,
+        status="unresolved",
+    )
+
+    (incident,) = orjson.loads(serialize_incidents()["incidents_json"])
+
+    assert (incident["lat"], incident["lon"]) == (19.123457, -99.987654)
+    assert incident["type"] == "Robo"
+    assert incident["description"] == "Sin descripción"
+    assert incident["date"] == "2024-01-01"
@@ -0,0 +1,59 @@
+from datetime import date, time
+from pathlib import Path
+
+import networkx as nx
+import pytest
+from django.contrib.gis.geos import Point
+
+from core import views
+from core.models import Incident
+
+
+def create_incident(lat=19.401, lon=-99.15):
+    return Incident.objects.create(
+        type="robbery",
+        description="Ejemplo",
+        incident_date=date(2024, 1, 1),
+        incident_time=time(12, 0),
+        latitude=lat,
+        longitude=lon,
+        location=Point(lon, lat),  # lon, lat
+        severity=3,
+        status="unresolved",
+    )
+
+
+@pytest.mark.django_db
+def test_editing_an_incident_changes_the_version():
+    incident = create_incident()
+    before = views._incidents_version()
+
+    # Misma cantidad e id más alto: solo cambia la fecha de modificación
+    incident.severity = 5
+    incident.save()
+
+    assert views._incidents_version() != before
+
+
+@pytest.mark.django_db
+def test_editing_an_incident_invalidates_the_cached_route(monkeypatch):
+    incident = create_incident()
+
+    # Grafo en línea que pasa junto al incidente
+    graph = nx.MultiDiGraph()
+    for i in range(3):
+        graph.add_node(i, y=19.4 + i * 0.001, x=-99.15)
+    for i in range(2):
+        graph.add_edge(i, i + 1, length=100.0)
+    monkeypatch.setattr(views, "load_graph", lambda path: graph)
+    views._route.cache_clear()
+
+    args = (Path("prueba.graphml"), (19.4, -99.15), (19.402, -99.15), 0.5)
+    first = views._route(*args, views._incidents_version())
+    assert views._route(*args, views._incidents_version()) is first
+
+    incident.severity = 5
+    incident.save()
+    views._route(*args, views._incidents_version())
+
+    assert views._route.cache_info().misses == 2
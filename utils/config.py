@@ -3,10 +3,16 @@ from typing import Dict, List
 
 import yaml
 
+# Cargador en C de libyaml si está disponible
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
 
 def load_config(path: Path) -> Dict[str, Dict]:
     with open(path, "r", encoding="utf-8") as file:
-        return yaml.safe_load(file)
+        return yaml.load(file, Loader=SafeLoader)
 
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -14,8 +20,15 @@ CONFIG_PATH = BASE_DIR / "config.yaml"
 GRAPH_DIR = BASE_DIR / "cache" / "graphs"
 PREBUILT_GRAPH_DIR = GRAPH_DIR / "prebuilt"
 DYNAMIC_GRAPH_DIR = GRAPH_DIR / "dynamic"
-
-for dir in (PREBUILT_GRAPH_DIR, DYNAMIC_GRAPH_DIR):
+FUZZY_CACHE_DIR = BASE_DIR / "cache" / "fuzzy"
+OSMNX_CACHE_DIR = BASE_DIR / "cache" / "osmnx"
+
+for dir in (
+    PREBUILT_GRAPH_DIR,
+    DYNAMIC_GRAPH_DIR,
+    FUZZY_CACHE_DIR,
+    OSMNX_CACHE_DIR,
+):
     dir.mkdir(parents=True, exist_ok=True)
 
 CONFIG = load_config(CONFIG_PATH)
@@ -0,0 +1,71 @@
+import numpy as np
+
+# Radio medio de la Tierra (IUGG), en metros
+EARTH_RADIUS_M = 6_371_008.8
+
+
+def to_local_meters(
+    lats: np.ndarray, lons: np.ndarray, ref_lat: float
+) -> np.ndarray:
+    """
+    Proyecta coordenadas a metros con una aproximación equirectangular.
+
+    Args:
+        lats: Latitudes en grados.
+        lons: Longitudes en grados.
+        ref_lat: Latitud de referencia de la proyección.
+
+    Returns:
+        Arreglo (N, 2) de coordenadas planas en metros.
+    """
+    scale = np.radians(EARTH_RADIUS_M)
+    return np.column_stack(
+        (
+            np.asarray(lons) * scale * np.cos(np.radians(ref_lat)),
+            np.asarray(lats) * scale,
+        )
+    )
+
+
+def haversine_meters(p1: np.ndarray, p2: np.ndarray) -> np.ndarray:
+    """
+    Calcula la distancia de gran círculo entre pares de puntos.
+
+    Args:
+        p1: Arreglo (N, 2) de puntos [lat, lon] en grados.
+        p2: Arreglo (N, 2) de puntos [lat, lon] en grados.
+
+    Returns:
+        Arreglo de N distancias en metros.
+    """
+    lat1, lon1 = np.radians(p1).T
+    lat2, lon2 = np.radians(p2).T
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+def unit_vectors(lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """
+    Convierte coordenadas en grados a puntos 3-D sobre la esfera unitaria.
+
+    La distancia de cuerda entre estos puntos crece con la distancia de gran
+    círculo, por lo que sirve para búsquedas de vecino más cercano.
+
+    Args:
+        lats: Latitudes en grados.
+        lons: Longitudes en grados.
+
+    Returns:
+        Arreglo (N, 3) de puntos sobre la esfera unitaria.
+    """
+    lats, lons = np.radians(lats), np.radians(lons)
+    return np.column_stack(
+        (
+            np.cos(lats) * np.cos(lons),
+            np.cos(lats) * np.sin(lons),
+            np.sin(lats),
+        )
+    )
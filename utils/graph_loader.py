@@ -1,66 +1,244 @@
+import json
+import os
+import pickle
+import threading
+from functools import lru_cache
+from itertools import chain
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional, TypeVar
+from weakref import WeakKeyDictionary
 
 import networkx as nx
+import numpy as np
 import osmnx as ox
-from django.contrib.gis.geos import Point, Polygon
-from osmnx.truncate import truncate_graph_dist
+from scipy.spatial import cKDTree
 
-from .config import cache_locations, PREBUILT_GRAPH_DIR, DYNAMIC_GRAPH_DIR
+from .config import (
+    cache_locations,
+    PREBUILT_GRAPH_DIR,
+    DYNAMIC_GRAPH_DIR,
+    OSMNX_CACHE_DIR,
+)
+from .geo import EARTH_RADIUS_M, haversine_meters, unit_vectors
 
 ox.settings.overpass_endpoint = "https://overpass.kumi.systems/api"
+ox.settings.use_cache = True
+ox.settings.cache_folder = OSMNX_CACHE_DIR
 
+T = TypeVar("T")
 
-def point_in_graph(graph: nx.MultiDiGraph, point: tuple[float, float]) -> bool:
-    """Check if a point is inside the graph's bounding box."""
-    nodes = ox.graph_to_gdfs(graph, edges=False)
-    bounds = nodes.total_bounds  # [minx, miny, maxx, maxy]
-    bbox = Polygon.from_bbox((bounds[0], bounds[1], bounds[2], bounds[3]))
-    point_geom = Point(point[1], point[0])  # lon, lat
-    return bbox.contains(point_geom)
+_graph_caches: WeakKeyDictionary = WeakKeyDictionary()
 
 
-def graph_contains(
+@lru_cache(maxsize=8)
+def _load_graph(path: Path, mtime_ns: int) -> nx.MultiDiGraph:
+    pickled = path.with_suffix(".pkl")
+    if pickled.exists() and pickled.stat().st_mtime_ns >= mtime_ns:
+        with open(pickled, "rb") as file:
+            return pickle.load(file)
+
+    graph = ox.load_graphml(path)
+    _save_pickle(graph, pickled)
+    return graph
+
+
+def _tmp_name(path: Path) -> str:
+    """Return a temporary file name unique to this process and thread."""
+    return f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+def _save_pickle(graph: nx.MultiDiGraph, path: Path) -> None:
+    """Write a pickled copy of a graph next to its GraphML file.
+
+    The file is written under a temporary name and moved into place, so
+    other workers and threads never read or overwrite a partial pickle.
+    """
+    tmp = path.with_name(_tmp_name(path))
+    with open(tmp, "wb") as file:
+        pickle.dump(graph, file, protocol=pickle.HIGHEST_PROTOCOL)
+    tmp.replace(path)
+
+
+def load_graph(path: Path) -> nx.MultiDiGraph:
+    """Load a GraphML file, reusing the parsed graph until the file changes.
+
+    After the first parse a pickled copy is kept beside the GraphML file
+    and loaded instead while it is newer. The returned graph is shared
+    between callers and must not be mutated.
+    """
+    return _load_graph(path, path.stat().st_mtime_ns)
+
+
+def graph_cache(graph: nx.MultiDiGraph, key: str, build: Callable[[], T]) -> T:
+    """Return a value derived from the graph, building it on first use.
+
+    Values are kept beside the graph object rather than in graph.graph, so
+    copies and subgraphs never inherit their parent's arrays. An entry is
+    rebuilt if the node count changed since it was stored.
+    """
+    cache = _graph_caches.setdefault(graph, {})
+    cached = cache.get(key)
+    if cached is not None and cached[0] == len(graph):
+        return cached[1]
+
+    value = build()
+    cache[key] = len(graph), value
+    return value
+
+
+def node_arrays(
     graph: nx.MultiDiGraph,
-    origin: tuple[float, float],
-    destination: tuple[float, float],
+) -> tuple[list[int], np.ndarray, np.ndarray]:
+    """Return node ids with their latitudes and longitudes.
+
+    A node without coordinates gets NaN. This is the one pass over the node
+    attributes; every other per-node array is derived from it.
+    """
+
+    def build():
+        ids = list(graph.nodes)
+        lats = np.fromiter(
+            (y for _, y in graph.nodes(data="y", default=np.nan)),
+            float,
+            len(ids),
+        )
+        lons = np.fromiter(
+            (x for _, x in graph.nodes(data="x", default=np.nan)),
+            float,
+            len(ids),
+        )
+        return ids, lats, lons
+
+    return graph_cache(graph, "node_arrays", build)
+
+
+def graph_bounds(graph: nx.MultiDiGraph) -> tuple[float, float, float, float]:
+    """Return the (minx, miny, maxx, maxy) bounds of the graph's nodes."""
+
+    def build():
+        _, ys, xs = node_arrays(graph)
+        return (
+            float(np.nanmin(xs)),
+            float(np.nanmin(ys)),
+            float(np.nanmax(xs)),
+            float(np.nanmax(ys)),
+        )
+
+    return graph_cache(graph, "bounds", build)
+
+
+@lru_cache(maxsize=None)
+def _file_bounds(
+    path: Path, mtime_ns: int
+) -> tuple[float, float, float, float]:
+    sidecar = path.with_suffix(".bounds.json")
+    if sidecar.exists() and sidecar.stat().st_mtime_ns >= mtime_ns:
+        return tuple(json.loads(sidecar.read_text()))
+
+    bounds = graph_bounds(load_graph(path))
+    tmp = sidecar.with_name(_tmp_name(sidecar))
+    tmp.write_text(json.dumps(bounds))
+    tmp.replace(sidecar)
+    return bounds
+
+
+def file_bounds(path: Path) -> tuple[float, float, float, float]:
+    """Return the node bounds of a graph file without loading it when possible.
+
+    The bounds are kept in a small JSON file beside the graph, so choosing
+    a graph for a route only loads the one that is actually used.
+    """
+    return _file_bounds(path, path.stat().st_mtime_ns)
+
+
+def point_in_bounds(
+    bounds: tuple[float, float, float, float], point: tuple[float, float]
 ) -> bool:
-    return point_in_graph(graph, origin) and point_in_graph(graph, destination)
+    """Check if a (lat, lon) point is inside (minx, miny, maxx, maxy) bounds."""
+    minx, miny, maxx, maxy = bounds
+    lat, lon = point
+    return minx < lon < maxx and miny < lat < maxy
 
 
 def find_graph_for_route(
     origin: tuple[float, float], destination: tuple[float, float]
 ) -> Optional[Path]:
-    for name in cache_locations.keys():
-        path = PREBUILT_GRAPH_DIR / f"{name}.graphml"
+    prebuilt = (
+        PREBUILT_GRAPH_DIR / f"{name}.graphml" for name in cache_locations
+    )
+    dynamic = DYNAMIC_GRAPH_DIR.glob("*.graphml")
+
+    for path in chain(prebuilt, dynamic):
         if path.exists():
-            graph = ox.load_graphml(path)
-            if graph_contains(graph, origin, destination):
+            bounds = file_bounds(path)
+            if point_in_bounds(bounds, origin) and point_in_bounds(
+                bounds, destination
+            ):
                 return path
 
-    for path in DYNAMIC_GRAPH_DIR.glob("*.graphml"):
-        graph = ox.load_graphml(path)
-        if graph_contains(graph, origin, destination):
-            return path
-
     return None
 
 
+def node_tree(graph: nx.MultiDiGraph) -> tuple[cKDTree, list[int]]:
+    """Return a KD-tree over the graph's nodes with the matching node ids.
+
+    Chord distance on the unit sphere is monotonic in great-circle distance,
+    so the nearest point in the tree is the nearest node on the map.
+    """
+
+    def build():
+        ids, lats, lons = node_arrays(graph)
+        return cKDTree(unit_vectors(lats, lons)), ids
+
+    return graph_cache(graph, "node_tree", build)
+
+
+def get_nearest_nodes(
+    graph: nx.MultiDiGraph, points: list[tuple[float, float]]
+) -> list[int]:
+    """Find the nearest node to each (lat, lon) point with a single query."""
+    tree, ids = node_tree(graph)
+    lats, lons = np.array(points, dtype=float).T
+    _, rows = tree.query(unit_vectors(lats, lons))
+    return [ids[row] for row in rows]
+
+
 def get_local_subgraph(graph, origin, destination, buffer_m=2000):
-    mid_lat = (origin[0] + destination[0]) / 2
-    mid_lon = (origin[1] + destination[1]) / 2
-    source_node = ox.distance.nearest_nodes(graph, mid_lon, mid_lat)
+    """Trim the graph to the bounding box of both points plus a margin.
+
+    The margin is the larger of buffer_m and 30% of the distance between
+    the points, so long routes keep room to detour around the straight line.
+    """
+    ids, lats, lons = node_arrays(graph)
+    distance_m = haversine_meters(np.array([origin]), np.array([destination]))
+    margin_m = max(buffer_m, 0.3 * float(distance_m[0]))
+
+    # Metres to degrees; longitude degrees shrink with the latitude
+    (min_lat, min_lon), (max_lat, max_lon) = np.sort(
+        [origin, destination], axis=0
+    )
+    dlat = np.degrees(margin_m / EARTH_RADIUS_M)
+    dlon = dlat / max(
+        np.cos(np.radians(max(abs(min_lat), abs(max_lat)))), 1e-6
+    )
 
-    return truncate_graph_dist(
-        graph, source_node, dist=buffer_m, weight="length"
+    inside = (
+        (lats >= min_lat - dlat)
+        & (lats <= max_lat + dlat)
+        & (lons >= min_lon - dlon)
+        & (lons <= max_lon + dlon)
     )
+    return graph.subgraph([ids[i] for i in np.flatnonzero(inside)]).copy()
 
 
 def save_dynamic_graph(center: tuple[float, float], radius_m: float) -> Path:
-    graph = ox.graph_from_point(center, dist=radius_m, network_type="drive")
     filename = (
         f"{round(center[0], 4)}_{round(center[1], 4)}_{radius_m}.graphml"
     )
     path = DYNAMIC_GRAPH_DIR / filename
+    if path.exists():
+        return path
+
+    graph = ox.graph_from_point(center, dist=radius_m, network_type="drive")
     ox.save_graphml(graph, path)
     return path
@@ -1,3 +1,4 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
 
@@ -9,30 +10,36 @@ from .config import (
     cache_radius,
     PREBUILT_GRAPH_DIR,
 )
+from .graph_loader import file_bounds
 
-ox.settings.use_cache = True
-ox.settings.log_console = True
+MAX_WORKERS = 4
+
+
+# Instante a partir del cual un grafo se considera reciente
+RECENT_CUTOFF = (datetime.now() - timedelta(days=cache_max_age)).timestamp()
 
 
 def is_recent(filepath: Path) -> bool:
     """Verifica si el archivo fue modificado hace menos de X días."""
-    if not filepath.exists():
+    try:
+        return filepath.stat().st_mtime > RECENT_CUTOFF
+    except FileNotFoundError:
         return False
-    modified = datetime.fromtimestamp(filepath.stat().st_mtime)
-    return modified > datetime.now() - timedelta(days=cache_max_age)
 
 
-for name, (lat, lon) in cache_locations.items():
+def build_graph(name: str, lat: float, lon: float) -> None:
+    """Descarga y guarda el grafo de una ubicación si no hay uno reciente."""
     if not isinstance(lat, float) or not isinstance(lon, float):
         print(f"Latitud o longitud no válidas para {name}. Omitido.")
-        continue
+        return
 
     filename = f"{name}.graphml"
     filepath = PREBUILT_GRAPH_DIR / filename
 
     if is_recent(filepath):
         print(f"Grafo reciente encontrado para {name}, omitido.")
-        continue
+        file_bounds(filepath)
+        return
 
     print(f"Generando grafo para {name}...")
     try:
@@ -40,6 +47,24 @@ for name, (lat, lon) in cache_locations.items():
             (lat, lon), dist=cache_radius, network_type="drive"
         )
         ox.save_graphml(graph, filepath)
+        # Límites y copia serializada listos antes de la primera solicitud,
+        # para que la búsqueda de grafo nunca tenga que leer GraphML
+        file_bounds(filepath)
         print(f"Grafo guardado: {filename}")
     except Exception as e:
         print(f"Error al generar grafo para {name}: {e}")
+
+
+def main() -> None:
+    """Genera los grafos de todas las ubicaciones configuradas."""
+    ox.settings.use_cache = True
+    ox.settings.log_console = True
+
+    # Cada ubicación es independiente; pocos hilos para no saturar Overpass
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        for name, (lat, lon) in cache_locations.items():
+            executor.submit(build_graph, name, lat, lon)
+
+
+if __name__ == "__main__":
+    main()